@@ -9,15 +9,17 @@ Usage:
     python build_indices.py [--rebuild]
 """
 
+import json
 import os
 import argparse
-from config import SYNTHETIC_DATA_PATH
+from config import SYNTHETIC_DATA_PATH, load_chunks
 from graph_indexer import GraphIndexer
 from faiss_indexer import FAISSIndexer
 
 # Index storage paths
 FAISS_INDEX_PATH = "faiss_index"
 GRAPH_INDEX_MARKER = ".graph_index_built"
+MANIFEST_PATH = ".rag_manifest.json"
 
 def check_existing_indices():
     """Check if indices already exist"""
@@ -26,44 +28,66 @@ def check_existing_indices():
     
     return faiss_exists, graph_exists
 
-def build_faiss_index(force_rebuild=False):
-    """Build FAISS index if it doesn't exist or force rebuild"""
+def write_manifest():
+    """Record which indices are built so the runtime scripts can check a
+    single in-memory manifest instead of stat-ing sentinel files."""
+    faiss_exists, graph_exists = check_existing_indices()
+    manifest = {
+        "faiss": {"built": faiss_exists, "path": FAISS_INDEX_PATH},
+        "graph": {"built": graph_exists, "node_label": "Document"},
+    }
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"📝 Manifest written to {MANIFEST_PATH}")
+
+def build_faiss_index(force_rebuild=False, documents=None):
+    """Build FAISS index if it doesn't exist or force rebuild.
+
+    Returns the FAISSIndexer on success (so its embeddings can be reused by
+    the graph build), True when skipped, False on failure.
+    """
     faiss_exists, _ = check_existing_indices()
-    
+
     if faiss_exists and not force_rebuild:
         print("✅ FAISS index already exists, skipping...")
         return True
-    
+
     print("🚀 Building FAISS index...")
     try:
         faiss_indexer = FAISSIndexer()
-        faiss_indexer.build_index(SYNTHETIC_DATA_PATH)
+        if documents is None:
+            documents = faiss_indexer.load_and_split_documents(SYNTHETIC_DATA_PATH)
+        else:
+            faiss_indexer.documents = documents
+        faiss_indexer.create_faiss_index(documents)
         faiss_indexer.save_index(FAISS_INDEX_PATH)
         faiss_indexer.get_index_stats()
         print("✅ FAISS index built and saved successfully!")
-        return True
+        return faiss_indexer
     except Exception as e:
         print(f"❌ Error building FAISS index: {e}")
         return False
 
-def build_graph_index(force_rebuild=False):
+def build_graph_index(force_rebuild=False, documents=None, precomputed_embeddings=None):
     """Build Graph index if it doesn't exist or force rebuild"""
     _, graph_exists = check_existing_indices()
-    
+
     if graph_exists and not force_rebuild:
         print("✅ Graph index already exists, skipping...")
         return True
-    
+
     print("🚀 Building Graph index...")
     try:
         graph_indexer = GraphIndexer()
-        
+
         # Clear existing graph data if rebuilding
         if force_rebuild:
             graph_indexer.kg.query("MATCH (n) DETACH DELETE n")
             print("🧹 Cleared existing graph data")
-        
-        graph_indexer.build_index(SYNTHETIC_DATA_PATH)
+
+        if documents is None:
+            documents = graph_indexer.load_and_split_documents(SYNTHETIC_DATA_PATH)
+        graph_indexer.create_graph_index(documents, precomputed_embeddings)
         graph_indexer.get_graph_stats()
         
         # Create marker file to indicate graph is built
@@ -110,15 +134,27 @@ Examples:
             print("🚀 You can now run: python demo.py")
             return
     
+    # Load and split the corpus once; both indexers chunk identically
+    documents = load_chunks(SYNTHETIC_DATA_PATH)
+
     # Build indices
     success_count = 0
-    
-    if build_faiss_index(args.rebuild):
+
+    faiss_result = build_faiss_index(args.rebuild, documents)
+    if faiss_result:
         success_count += 1
-    
-    if build_graph_index(args.rebuild):
+
+    # Hand the FAISS embeddings to the graph build so Document nodes are
+    # not re-embedded from scratch
+    precomputed_embeddings = None
+    if isinstance(faiss_result, FAISSIndexer):
+        precomputed_embeddings = faiss_result.get_embedding_matrix()
+
+    if build_graph_index(args.rebuild, documents, precomputed_embeddings):
         success_count += 1
-    
+
+    write_manifest()
+
     # Summary
     print("\n" + "="*60)
     print("INDEX BUILDING SUMMARY")
@@ -1,6 +1,12 @@
 from dotenv import load_dotenv
+import asyncio
+import atexit
 import os
-from langchain_openai import ChatOpenAI
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_community.document_loaders import TextLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 
 # Load environment variables
 load_dotenv()
@@ -17,10 +23,83 @@ AUTH = (NEO4J_USERNAME, NEO4J_PASSWORD)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_ENDPOINT = os.getenv("OPENAI_ENDPOINT")
 
+# One pooled async HTTP client shared by the chat and embeddings clients:
+# the gathered queries reuse keep-alive TLS sessions instead of paying a
+# handshake per concurrent request
+_http_async_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+)
+
+def _close_http_client():
+    """Close the shared client at exit so httpx doesn't warn about it"""
+    try:
+        asyncio.run(_http_async_client.aclose())
+    except Exception:
+        pass  # interpreter is shutting down anyway
+
+atexit.register(_close_http_client)
+
 # Initialize LLM
-chat = ChatOpenAI(api_key=OPENAI_API_KEY, temperature=0, model="gpt-4o-mini")
+chat = ChatOpenAI(
+    api_key=OPENAI_API_KEY, temperature=0, model="gpt-4o-mini",
+    http_async_client=_http_async_client,
+)
+
+# Shared embeddings client: one instance means one HTTP connection pool and
+# one tokenizer load across indexers, retrievers and vector indexes
+embeddings = OpenAIEmbeddings(
+    api_key=OPENAI_API_KEY,
+    http_async_client=_http_async_client,
+)
 
 # Data Configuration
 SYNTHETIC_DATA_PATH = "synthetic_data.txt"
 CHUNK_SIZE = 256
-CHUNK_OVERLAP = 24
\ No newline at end of file
+CHUNK_OVERLAP = 24
+
+def _merge_adjacent_chunks(documents, target_size, overlap):
+    """Second pass of the split-then-merge splitter: greedily merge adjacent
+    chunks back up toward the target size.
+
+    The single-pass recursive split frequently emits tiny context-poor
+    chunks; merging neighbors (within a 5% size tolerance) cuts the total
+    chunk count and with it embedding and graph-transform cost.
+    """
+    merged = []
+    for doc in documents:
+        if merged and len(merged[-1].page_content) + len(doc.page_content) <= target_size * 1.05:
+            prev = merged[-1]
+            content = doc.page_content
+            # Drop the splitter overlap when the next chunk repeats our tail
+            for k in range(min(overlap, len(content)), 0, -1):
+                if prev.page_content.endswith(content[:k]):
+                    content = content[k:]
+                    break
+            merged[-1] = Document(
+                page_content=prev.page_content + "\n" + content,
+                metadata=prev.metadata
+            )
+        else:
+            merged.append(doc)
+    return merged
+
+def load_chunks(file_path: str = SYNTHETIC_DATA_PATH):
+    """Load the corpus and split into chunks (shared by both indexers)"""
+    print(f"Loading documents from {file_path}")
+
+    # Load documents
+    raw_documents = TextLoader(file_path, encoding="latin-1").load()
+
+    # Split into chunks
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE * 4,  # Characters instead of tokens
+        chunk_overlap=CHUNK_OVERLAP * 2,
+        separators=["\n________________________________________\n", "\n\n", "\n", ". ", " "]
+    )
+    documents = text_splitter.split_documents(raw_documents)
+
+    # Merge pass: fold undersized chunks into their neighbors
+    documents = _merge_adjacent_chunks(documents, CHUNK_SIZE * 4, CHUNK_OVERLAP * 2)
+
+    print(f"Loaded {len(documents)} chunks from {file_path}.")
+    return documents
\ No newline at end of file
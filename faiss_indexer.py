@@ -1,70 +1,214 @@
+import gzip
+import json
+import os
+import tempfile
 import faiss
 import numpy as np
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.documents import Document
 from config import *
 
+# Number of texts sent to the embeddings endpoint per request. Large batches
+# collapse many small HTTP round-trips into a few big ones.
+EMBED_BATCH_SIZE = 1024
+
+# Below this many vectors an exhaustive flat index is fast enough and IVF+PQ
+# has too few training points to be worth it.
+IVFPQ_MIN_VECTORS = 10000
+
+# Factory string for the ANN index: OPQ rotation + 128-dim reduction, an
+# IVF with an HNSW coarse quantizer, and 64-byte PQ codes. nlist is filled
+# in per corpus since IVF4096 needs far more training points than small
+# corpora provide.
+IVFPQ_FACTORY = "OPQ64_128,IVF{nlist}_HNSW32,PQ64"
+
+# Number of Voronoi cells probed at query time (recall/latency trade-off)
+IVFPQ_NPROBE = 8
+
 class FAISSIndexer:
-    def __init__(self):
+    def __init__(self, embedding_client=None):
         """Initialize FAISS components"""
-        self.embeddings = OpenAIEmbeddings()
+        # Reuse the shared embeddings client unless one is injected
+        self.embeddings = embedding_client or embeddings
         self.vector_store = None
+        self.binary_index = None
         self.documents = None
+        self._embedding_matrix = None
+        self._n_docs = None
         
     def load_and_split_documents(self, file_path: str):
         """Load documents from file and split into chunks"""
-        print(f"Loading documents from {file_path}")
-        
-        # Load documents
-        raw_documents = TextLoader(file_path, encoding="latin-1").load()
-        
-        # Split into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE * 4,  # Characters instead of tokens
-        chunk_overlap=CHUNK_OVERLAP * 2,
-        separators=["\n________________________________________\n", "\n\n", "\n", ". ", " "]
-        )
-        documents = text_splitter.split_documents(raw_documents)
-        
-        print(f"Loaded {len(documents)} chunks for FAISS indexing.")
+        documents = load_chunks(file_path)
         self.documents = documents
         return documents
     
+    def embed_in_batches(self, texts, batch_size: int = EMBED_BATCH_SIZE):
+        """Embed texts in large batches, streaming results into a float32 memmap"""
+        vectors = None
+        for i in range(0, len(texts), batch_size):
+            batch = self.embeddings.embed_documents(texts[i:i + batch_size])
+            if vectors is None:
+                # Learn the embedding dimension from the first batch, then
+                # stream every batch straight to an on-disk scratch buffer
+                # instead of accumulating Python lists of floats
+                fd, scratch_path = tempfile.mkstemp(suffix=".f32")
+                os.close(fd)
+                vectors = np.memmap(
+                    scratch_path, dtype=np.float32, mode="w+",
+                    shape=(len(texts), len(batch[0]))
+                )
+                # The mapping keeps the pages alive, so unlink the scratch
+                # file now — no leftover to clean up or collide with when
+                # two builds run from the same directory
+                os.unlink(scratch_path)
+            vectors[i:i + len(batch)] = np.asarray(batch, dtype=np.float32)
+            print(f"Embedded {min(i + batch_size, len(texts))}/{len(texts)} chunks")
+        return vectors
+
     def create_faiss_index(self, documents):
         """Create FAISS vector index from documents"""
         print("Creating FAISS vector index...")
-        
+
+        # Embed all chunks in batches, then build the index from the
+        # precomputed vectors (avoids LangChain's per-document requests)
+        texts = [doc.page_content for doc in documents]
+        vectors = self.embed_in_batches(texts)
+        self._embedding_matrix = vectors
+
         # Create FAISS vector store
-        self.vector_store = FAISS.from_documents(
-            documents=documents,
-            embedding=self.embeddings
+        self.vector_store = FAISS.from_embeddings(
+            text_embeddings=list(zip(texts, vectors)),
+            embedding=self.embeddings,
+            metadatas=[doc.metadata for doc in documents]
         )
-        
+
+        # Swap the default exhaustive FP32 flat index for a quantized one:
+        # IVF+PQ on larger corpora, 8-bit scalar quantization otherwise
+        self._compress_index(vectors)
+
+        # The Document list is no longer needed once everything is in the
+        # index and docstore; keep only the count for stats and let the
+        # largest remaining allocation be collected
+        self._n_docs = len(documents)
+        self.documents = None
+
         print("FAISS index created successfully!")
         return self.vector_store
+
+    def _compress_index(self, vectors):
+        """Replace the flat FP32 index with a quantized index to cut memory bandwidth"""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        n, d = matrix.shape
+
+        if n >= IVFPQ_MIN_VECTORS:
+            nlist = min(4096, int(4 * np.sqrt(n)))
+            factory = IVFPQ_FACTORY.format(nlist=nlist)
+            print(f"Building {factory} index for {n} vectors...")
+            index = faiss.index_factory(d, factory)
+            faiss.extract_index_ivf(index).nprobe = IVFPQ_NPROBE
+        else:
+            # 8-bit scalar quantization: ~4x fewer bytes scanned per query
+            # than FP32 while keeping the exhaustive search exact enough
+            print(f"Building 8-bit scalar-quantized index for {n} vectors...")
+            index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit)
+
+        index.train(matrix)
+        index.add(matrix)
+
+        # The docstore ids are sequential, so the quantized index (which also
+        # assigns sequential ids on add) can be swapped in directly
+        self.vector_store.index = index
     
+    def get_embedding_matrix(self):
+        """Return the precomputed embedding matrix from the last build, if any"""
+        return self._embedding_matrix
+
     def build_index(self, file_path: str = SYNTHETIC_DATA_PATH):
         """Complete FAISS indexing pipeline"""
         documents = self.load_and_split_documents(file_path)
         return self.create_faiss_index(documents)
     
     def save_index(self, path: str = "faiss_index"):
-        """Save FAISS index to disk"""
+        """Save the raw FAISS index plus a compressed chunk store (no pickle)"""
         if self.vector_store:
-            self.vector_store.save_local(path)
+            os.makedirs(path, exist_ok=True)
+
+            # Raw index file, loadable with mmap
+            faiss.write_index(self.vector_store.index, os.path.join(path, "index.faiss"))
+
+            # Chunk texts stored once as compressed jsonl, ordered by FAISS
+            # id — far smaller than pickling the whole docstore
+            with gzip.open(os.path.join(path, "chunks.jsonl.gz"), "wt", encoding="utf-8") as f:
+                for i in range(len(self.vector_store.index_to_docstore_id)):
+                    doc = self.vector_store.docstore.search(
+                        self.vector_store.index_to_docstore_id[i]
+                    )
+                    f.write(json.dumps({
+                        "content": doc.page_content,
+                        "metadata": doc.metadata
+                    }) + "\n")
+
+            # Sign-binarized copy of the corpus (1 bit/dim) for fast Hamming
+            # candidate search, plus the raw FP32 matrix for rescoring the
+            # oversampled candidates at query time
+            if self._embedding_matrix is not None:
+                matrix = np.asarray(self._embedding_matrix, dtype=np.float32)
+                binary_index = faiss.IndexBinaryFlat(matrix.shape[1])
+                binary_index.add(np.packbits(matrix > 0, axis=1))
+                faiss.write_index_binary(binary_index, os.path.join(path, "index.binary"))
+                matrix.tofile(os.path.join(path, "embeddings.f32"))
+
             print(f"FAISS index saved to {path}")
-    
+
     def load_index(self, path: str = "faiss_index"):
-        """Load FAISS index from disk"""
+        """Load FAISS index from disk, memory-mapping the vector array"""
+        # Indexes saved by the old pickle-based format (LangChain
+        # save_local: index.faiss + index.pkl) have no chunk store and
+        # can't be loaded here — say so instead of failing opaquely
+        if (not os.path.exists(os.path.join(path, "chunks.jsonl.gz"))
+                and os.path.exists(os.path.join(path, "index.pkl"))):
+            print(f"FAISS index at {path} uses the old pickle format; "
+                  "rebuild it with: python build_indices.py --rebuild")
+            return None
+
         try:
-            self.vector_store = FAISS.load_local(
-                path, 
-                self.embeddings, 
-                allow_dangerous_deserialization=True
+            # Memory-map the raw index so the OS only pages in the vectors a
+            # query actually touches, instead of deserializing everything
+            index = faiss.read_index(
+                os.path.join(path, "index.faiss"),
+                faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+            )
+
+            # Rebuild the docstore from the jsonl chunk store; line order
+            # matches the FAISS integer ids
+            docs = {}
+            with gzip.open(os.path.join(path, "chunks.jsonl.gz"), "rt", encoding="utf-8") as f:
+                for i, line in enumerate(f):
+                    record = json.loads(line)
+                    docs[str(i)] = Document(
+                        page_content=record["content"],
+                        metadata=record.get("metadata", {})
+                    )
+
+            self.vector_store = FAISS(
+                embedding_function=self.embeddings,
+                index=index,
+                docstore=InMemoryDocstore(docs),
+                index_to_docstore_id={i: str(i) for i in range(len(docs))}
             )
-            print(f"FAISS index loaded from {path}")
+
+            # Binary index + memory-mapped FP32 matrix for the rescored
+            # Hamming search path (older saves won't have them)
+            binary_path = os.path.join(path, "index.binary")
+            if os.path.exists(binary_path):
+                self.binary_index = faiss.read_index_binary(binary_path)
+                self._embedding_matrix = np.memmap(
+                    os.path.join(path, "embeddings.f32"), dtype=np.float32,
+                    mode="r", shape=(index.ntotal, index.d)
+                )
+
+            print(f"FAISS index loaded (memory-mapped) from {path}")
             return self.vector_store
         except Exception as e:
             print(f"Failed to load FAISS index: {e}")
@@ -81,12 +225,12 @@ class FAISSIndexer:
             print(f"FAISS Index Statistics:")
             print(f"- Vectors: {vector_count}")
             print(f"- Dimensions: {dimension}")
-            print(f"- Documents: {len(self.documents) if self.documents else 'N/A'}")
-            
+            print(f"- Documents: {self._n_docs if self._n_docs is not None else 'N/A'}")
+
             return {
-                "vectors": vector_count, 
+                "vectors": vector_count,
                 "dimensions": dimension,
-                "documents": len(self.documents) if self.documents else 0
+                "documents": self._n_docs or 0
             }
         else:
             print("FAISS index not initialized")
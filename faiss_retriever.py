@@ -1,65 +1,151 @@
+import os
 from typing import List, Dict, Any
+import faiss
+import numpy as np
 
 class FAISSRetriever:
-    def __init__(self, vector_store):
-        """Initialize with FAISS vector store"""
+    def __init__(self, vector_store, binary_index=None, fp32_matrix=None):
+        """Initialize with FAISS vector store.
+
+        When a binary (1 bit/dim) index and the FP32 matrix are supplied,
+        retrieve() runs a Hamming candidate search over the packed bits and
+        rescores the oversampled candidates against the FP32 vectors —
+        popcount+XOR over 1/32 the bytes of the quantized scan.
+        """
         self.vector_store = vector_store
-    
+        self.binary_index = binary_index
+        self.fp32_matrix = fp32_matrix
+        # Let FAISS use all cores; pays off for batched multi-query search
+        faiss.omp_set_num_threads(os.cpu_count() or 4)
+        # Cache query embeddings so retrieve/retrieve_with_scores/... on the
+        # same question pay for one embedding round-trip, not one per method
+        self._embed_cache = {}
+
+    def _embed_query(self, question: str):
+        """Embed a query, reusing cached or primed vectors"""
+        if question not in self._embed_cache:
+            self._embed_cache[question] = self.vector_store.embeddings.embed_query(question)
+        return self._embed_cache[question]
+
+    def prime_embedding_cache(self, questions: List[str]):
+        """Embed many questions in one batched request and seed the cache"""
+        missing = [q for q in questions if q not in self._embed_cache]
+        if missing:
+            vectors = self.vector_store.embeddings.embed_documents(missing)
+            self._embed_cache.update(zip(missing, vectors))
+
+    def _binary_search_rescored(self, question: str, k: int, oversample: int = 4):
+        """Hamming search over the binary index, rescored against FP32 vectors"""
+        query = np.asarray(self._embed_query(question), dtype=np.float32)
+
+        # Coarse pass: popcount distances over the sign bits
+        packed = np.packbits(query > 0).reshape(1, -1)
+        n_candidates = min(k * oversample, self.binary_index.ntotal)
+        _, ids = self.binary_index.search(packed, n_candidates)
+        candidates = [int(i) for i in ids[0] if i != -1]
+
+        # Fine pass: exact FP32 dot products over just the candidates
+        scores = self.fp32_matrix[candidates] @ query
+        order = np.argsort(scores)[::-1][:k]
+
+        docs = []
+        for j in order:
+            doc_id = self.vector_store.index_to_docstore_id[candidates[j]]
+            docs.append(self.vector_store.docstore.search(doc_id))
+        return docs
+
     def retrieve(self, question: str, k: int = 4) -> str:
         """Main retrieval method using vector similarity search"""
         print(f"FAISS Search query: {question}")
-        
-        # Perform similarity search
-        docs = self.vector_store.similarity_search(question, k=k)
-        
+
+        # Binary candidate search + FP32 rescore when the build produced the
+        # packed artifacts, otherwise the regular quantized-index search
+        if self.binary_index is not None and self.fp32_matrix is not None:
+            docs = self._binary_search_rescored(question, k)
+        else:
+            docs = self.vector_store.similarity_search_by_vector(
+                self._embed_query(question), k=k
+            )
+
         # Combine document content
         retrieved_content = []
         for i, doc in enumerate(docs):
             retrieved_content.append(f"Document {i+1}:\n{doc.page_content}")
-        
+
         final_data = "\n\n".join(retrieved_content)
-        
+
         print(f"\nFAISS Retrieval Result:")
         print(f"Document chunks found: {len(docs)}")
-        
+
         return final_data
-    
+
+    def batch_retrieve(self, questions: List[str], k: int = 4) -> List[List]:
+        """Retrieve for several questions with one embedding call and one FAISS search"""
+        print(f"FAISS batch search for {len(questions)} questions")
+
+        # One embedding request for all questions, one multithreaded FAISS
+        # search over the stacked query matrix
+        query_matrix = np.asarray(
+            self.vector_store.embeddings.embed_documents(questions),
+            dtype=np.float32
+        )
+        _, ids = self.vector_store.index.search(query_matrix, k)
+
+        # Resolve FAISS ids back to documents through the docstore
+        results = []
+        for row in ids:
+            docs = []
+            for idx in row:
+                if idx == -1:
+                    continue
+                doc_id = self.vector_store.index_to_docstore_id[int(idx)]
+                docs.append(self.vector_store.docstore.search(doc_id))
+            results.append(docs)
+
+        return results
+
     def retrieve_with_scores(self, question: str, k: int = 4) -> List[tuple]:
         """Retrieve documents with similarity scores"""
         print(f"FAISS Search with scores: {question}")
-        
+
         # Perform similarity search with scores
-        docs_with_scores = self.vector_store.similarity_search_with_score(question, k=k)
-        
+        docs_with_scores = self.vector_store.similarity_search_with_score_by_vector(
+            self._embed_query(question), k=k
+        )
+
         print(f"Retrieved {len(docs_with_scores)} documents with scores")
-        
+
         for i, (doc, score) in enumerate(docs_with_scores):
             print(f"Document {i+1} (Score: {score:.4f}): {doc.page_content[:100]}...")
-        
+
         return docs_with_scores
-    
+
     def retrieve_formatted(self, question: str, k: int = 4) -> str:
         """Retrieve and format results with scores for comparison"""
-        docs_with_scores = self.vector_store.similarity_search_with_score(question, k=k)
-        
+        docs_with_scores = self.vector_store.similarity_search_with_score_by_vector(
+            self._embed_query(question), k=k
+        )
+
         formatted_results = []
         for i, (doc, score) in enumerate(docs_with_scores):
             formatted_results.append(
                 f"Document {i+1} (Similarity Score: {score:.4f}):\n{doc.page_content}\n"
             )
-        
+
         return "\n".join(formatted_results)
-    
+
     def get_most_relevant_chunks(self, question: str, k: int = 4) -> Dict[str, Any]:
         """Get most relevant chunks with metadata"""
-        docs_with_scores = self.vector_store.similarity_search_with_score(question, k=k)
-        
+        docs_with_scores = self.vector_store.similarity_search_with_score_by_vector(
+            self._embed_query(question), k=k
+        )
+
         results = {
             "query": question,
             "num_results": len(docs_with_scores),
             "documents": []
         }
-        
+
         for i, (doc, score) in enumerate(docs_with_scores):
             doc_info = {
                 "rank": i + 1,
@@ -68,5 +154,5 @@ class FAISSRetriever:
                 "metadata": doc.metadata if hasattr(doc, 'metadata') else {}
             }
             results["documents"].append(doc_info)
-        
-        return results
\ No newline at end of file
+
+        return results
@@ -1,20 +1,62 @@
+import asyncio
 from langchain_core.runnables import (
-    RunnableBranch,
     RunnableLambda,
     RunnableParallel,
     RunnablePassthrough,
 )
-from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from langchain_core.prompts import PromptTemplate
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
 from typing import Tuple, List
 from config import chat
 
+# One parser instance shared by every chain; it is stateless
+_STR_PARSER = StrOutputParser()
+
 class RAGChains:
     def __init__(self):
         """Initialize RAG chains for both Graph and FAISS"""
+        # Query results cached per (chain, question, history) so repeated
+        # questions skip the retriever and LLM entirely
+        self._result_cache = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
+        # Built chains cached per retriever, so repeated create_* calls
+        # (interactive mode, single-question paths) reuse the Runnable DAG
+        self._chain_cache = {}
+        # Formatted chat histories cached per history tuple; growing a
+        # conversation only formats the newly appended turns
+        self._hist_cache = {}
         self.setup_chains()
-    
+
+    def _cache_key(self, chain, question: str, chat_history):
+        """Canonical cache key for one query against one chain"""
+        return (id(chain), question.strip().lower(), tuple(chat_history or ()))
+
+    def _cached_result(self, chain, question: str, chat_history):
+        """Look up a previous answer; counts hit/miss stats"""
+        result = self._result_cache.get(self._cache_key(chain, question, chat_history))
+        if result is not None:
+            self._cache_hits += 1
+        else:
+            self._cache_misses += 1
+        return result
+
+    def _store_result(self, chain, question: str, chat_history, result: str):
+        self._result_cache[self._cache_key(chain, question, chat_history)] = result
+
+    def clear_cache(self):
+        """Drop all cached query results"""
+        self._result_cache.clear()
+
+    def cache_stats(self):
+        """Return hit/miss counts for the query-result cache"""
+        return {
+            "entries": len(self._result_cache),
+            "hits": self._cache_hits,
+            "misses": self._cache_misses,
+        }
+
     def setup_chains(self):
         """Setup the common RAG chain components"""
         # Template for rephrasing questions with chat history
@@ -27,145 +69,248 @@ class RAGChains:
         Standalone question:"""
         
         self.condense_question_prompt = PromptTemplate.from_template(condense_template)
-        
-        # Template for answering questions based on context
-        answer_template = """Answer the question based only on the following context:
-        {context}
 
-        Question: {question}
-        Use natural language and be concise.
-        Answer:"""
-        
-        self.answer_prompt = ChatPromptTemplate.from_template(answer_template)
-        
-    def _format_chat_history(self, chat_history: List[Tuple[str, str]]) -> List:
-        """Format chat history for the chain"""
-        buffer = []
-        for human, ai in chat_history:
-            buffer.append(HumanMessage(content=human))
-            buffer.append(AIMessage(content=ai))
-        return buffer
-    
-    def create_graph_chain(self, graph_retriever):
-        """Create RAG chain for Graph RAG"""
-        # Search query processing with optional chat history
-        search_query = RunnableBranch(
-            (
-                RunnableLambda(lambda x: bool(x.get("chat_history"))).with_config(
-                    run_name="HasChatHistoryCheck"
-                ),
-                RunnablePassthrough.assign(
-                    chat_history=lambda x: self._format_chat_history(x["chat_history"])
-                )
-                | self.condense_question_prompt
-                | chat
-                | StrOutputParser(),
-            ),
-            RunnableLambda(lambda x: x["question"]),
+        # One condenser chain shared by every RAG chain, with a memo so the
+        # same (question, history) pair is only condensed by the LLM once —
+        # compare mode would otherwise condense each question twice
+        self._condenser_chain = self.condense_question_prompt | chat | _STR_PARSER
+        self._condense_cache = {}
+
+        # The answer prompt is static, so render it with one f-string per
+        # call instead of ChatPromptTemplate's generic substitution (regex
+        # parse + kwargs dispatch on every invocation)
+        self.format_answer_prompt = RunnableLambda(lambda d: [HumanMessage(content=(
+            "Answer the question based only on the following context:\n"
+            f"        {d['context']}\n\n"
+            f"        Question: {d['question']}\n"
+            "        Use natural language and be concise.\n"
+            "        Answer:"
+        ))])
+
+        # One condensing runnable shared by every chain; building it here
+        # (instead of once per create_*_chain call) keeps both chains on the
+        # same memoized condenser and skips a Runnable graph per setup
+        self._search_query = RunnableLambda(
+            lambda x: self.get_standalone(x["question"], x.get("chat_history"))
         )
-        
-        # Complete chain
-        chain = (
-            RunnableParallel({
-                "context": search_query | graph_retriever.retrieve,
-                "question": RunnablePassthrough(),
+
+    def get_standalone(self, question: str, chat_history: List[Tuple[str, str]] = None) -> str:
+        """Condense a follow-up into a standalone question, memoized per input"""
+        if not chat_history:
+            return question
+
+        key = (question, tuple(chat_history))
+        if key not in self._condense_cache:
+            self._condense_cache[key] = self._condenser_chain.invoke({
+                "question": question,
+                "chat_history": self._format_chat_history(chat_history),
             })
-            | self.answer_prompt
-            | chat
-            | StrOutputParser()
-        )
-        
-        return chain
+        return self._condense_cache[key]
+
+    async def _precondense(self, question: str, chat_history):
+        """Populate the condense memo before chains fan out concurrently.
+
+        Gathered chains would otherwise both miss the memo (neither has
+        stored a result yet) and condense the same question twice.
+        """
+        if chat_history:
+            await asyncio.to_thread(self.get_standalone, question, chat_history)
+
+    def _format_chat_history(self, chat_history: List[Tuple[str, str]]) -> List:
+        """Format chat history for the chain, reusing message objects.
+
+        Message construction runs Pydantic validation per message; caching
+        per history tuple makes a growing conversation pay only for its
+        newly appended turns instead of re-formatting every turn each call.
+        """
+        key = tuple(chat_history)
+        cached = self._hist_cache.get(key)
+        if cached is None:
+            # Start from the formatted prefix when the history only grew
+            prefix = self._hist_cache.get(key[:-1], ()) if key else ()
+            buffer = list(prefix)
+            for human, ai in key[len(buffer) // 2:]:
+                buffer.append(HumanMessage(content=human))
+                buffer.append(AIMessage(content=ai))
+            cached = self._hist_cache[key] = tuple(buffer)
+        return list(cached)
     
-    def create_faiss_chain(self, faiss_retriever):
-        """Create RAG chain for FAISS RAG"""
-        # Search query processing with optional chat history
-        search_query = RunnableBranch(
-            (
-                RunnableLambda(lambda x: bool(x.get("chat_history"))).with_config(
-                    run_name="HasChatHistoryCheck"
-                ),
-                RunnablePassthrough.assign(
-                    chat_history=lambda x: self._format_chat_history(x["chat_history"])
-                )
-                | self.condense_question_prompt
-                | chat
-                | StrOutputParser(),
-            ),
-            RunnableLambda(lambda x: x["question"]),
-        )
-        
-        # Complete chain
-        chain = (
+    def _build_chain(self, retriever):
+        """Assemble the retrieve -> prompt -> LLM chain for any retriever.
+
+        Graph and FAISS chains are identical apart from the retriever, so
+        one builder keeps them structurally in sync and on the shared
+        memoized condenser.
+        """
+        return (
             RunnableParallel({
-                "context": search_query | faiss_retriever.retrieve,
+                "context": self._search_query | retriever.retrieve,
                 "question": RunnablePassthrough(),
             })
-            | self.answer_prompt
+            | self.format_answer_prompt
             | chat
-            | StrOutputParser()
+            | _STR_PARSER
         )
-        
-        return chain
+
+    def create_graph_chain(self, graph_retriever):
+        """Create (or return the cached) RAG chain for Graph RAG"""
+        key = ("graph", id(graph_retriever))
+        if key not in self._chain_cache:
+            self._chain_cache[key] = self._build_chain(graph_retriever)
+        return self._chain_cache[key]
+
+    def create_faiss_chain(self, faiss_retriever):
+        """Create (or return the cached) RAG chain for FAISS RAG"""
+        key = ("faiss", id(faiss_retriever))
+        if key not in self._chain_cache:
+            self._chain_cache[key] = self._build_chain(faiss_retriever)
+        return self._chain_cache[key]
     
+    async def aquery_graph_rag(self, chain, question: str, chat_history: List[Tuple[str, str]] = None):
+        """Async Graph RAG query, usable under asyncio.gather for batches"""
+        cached = self._cached_result(chain, question, chat_history)
+        if cached is not None:
+            print(f"\nGRAPH RAG | Q: {question}\nA (cached): {cached}\n")
+            return cached
+
+        query_input = {"question": question}
+        if chat_history:
+            query_input["chat_history"] = chat_history
+
+        result = await chain.ainvoke(query_input)
+        self._store_result(chain, question, chat_history, result)
+
+        print(f"\nGRAPH RAG | Q: {question}\nA: {result}\n")
+        return result
+
+    async def aquery_faiss_rag(self, chain, question: str, chat_history: List[Tuple[str, str]] = None):
+        """Async FAISS RAG query, usable under asyncio.gather for batches"""
+        cached = self._cached_result(chain, question, chat_history)
+        if cached is not None:
+            print(f"\nFAISS RAG | Q: {question}\nA (cached): {cached}\n")
+            return cached
+
+        query_input = {"question": question}
+        if chat_history:
+            query_input["chat_history"] = chat_history
+
+        result = await chain.ainvoke(query_input)
+        self._store_result(chain, question, chat_history, result)
+
+        print(f"\nFAISS RAG | Q: {question}\nA: {result}\n")
+        return result
+
     def query_graph_rag(self, chain, question: str, chat_history: List[Tuple[str, str]] = None):
         """Query using Graph RAG chain"""
         print(f"\n{'='*50}")
         print("GRAPH RAG QUERY")
         print(f"{'='*50}")
         
-        query_input = {"question": question}
-        if chat_history:
-            query_input["chat_history"] = chat_history
-        
-        result = chain.invoke(query_input)
-        
+        result = self._cached_result(chain, question, chat_history)
+        if result is None:
+            query_input = {"question": question}
+            if chat_history:
+                query_input["chat_history"] = chat_history
+
+            result = chain.invoke(query_input)
+            self._store_result(chain, question, chat_history, result)
+
         print(f"Question: {question}")
         print(f"Answer: {result}")
         print(f"{'='*50}\n")
-        
+
         return result
-    
+
     def query_faiss_rag(self, chain, question: str, chat_history: List[Tuple[str, str]] = None):
         """Query using FAISS RAG chain"""
         print(f"\n{'='*50}")
         print("FAISS RAG QUERY")
         print(f"{'='*50}")
-        
-        query_input = {"question": question}
-        if chat_history:
-            query_input["chat_history"] = chat_history
-        
-        result = chain.invoke(query_input)
-        
+
+        result = self._cached_result(chain, question, chat_history)
+        if result is None:
+            query_input = {"question": question}
+            if chat_history:
+                query_input["chat_history"] = chat_history
+
+            result = chain.invoke(query_input)
+            self._store_result(chain, question, chat_history, result)
+
         print(f"Question: {question}")
         print(f"Answer: {result}")
         print(f"{'='*50}\n")
-        
+
         return result
     
-    def compare_rag_methods(self, graph_chain, faiss_chain, question: str, chat_history: List[Tuple[str, str]] = None):
-        """Compare both RAG methods side by side"""
+    async def acompare_rag_methods(self, graph_chain, faiss_chain, question: str, chat_history: List[Tuple[str, str]] = None):
+        """Compare both RAG methods, running their chains concurrently"""
         print(f"\n{'='*60}")
         print("RAG COMPARISON")
         print(f"{'='*60}")
         print(f"Question: {question}")
         print(f"{'='*60}")
-        
-        # Query FAISS RAG
-        faiss_result = self.query_faiss_rag(faiss_chain, question, chat_history)
-        
-        # Query Graph RAG
-        graph_result = self.query_graph_rag(graph_chain, question, chat_history)
-        
-        # Summary comparison
+
+        # Condense once up front so the gathered chains hit the memo
+        await self._precondense(question, chat_history)
+
+        # The two retrievals + LLM calls are independent, so overlap them;
+        # wall time drops from faiss+graph to max(faiss, graph). Routing
+        # through aquery_* also gives both sides the result cache.
+        faiss_result, graph_result = await asyncio.gather(
+            self.aquery_faiss_rag(faiss_chain, question, chat_history),
+            self.aquery_graph_rag(graph_chain, question, chat_history),
+        )
+
+        # Summary comparison (printed once both are done)
         print(f"\n{'='*60}")
         print("COMPARISON SUMMARY")
         print(f"{'='*60}")
         print(f"FAISS RAG Answer:\n{faiss_result}")
         print(f"\nGraph RAG Answer:\n{graph_result}")
         print(f"{'='*60}\n")
-        
+
+        return {
+            "question": question,
+            "faiss_result": faiss_result,
+            "graph_result": graph_result
+        }
+
+    def compare_rag_methods(self, graph_chain, faiss_chain, question: str, chat_history: List[Tuple[str, str]] = None):
+        """Compare both RAG methods side by side"""
+        return asyncio.run(
+            self.acompare_rag_methods(graph_chain, faiss_chain, question, chat_history)
+        )
+
+    async def astream_compare(self, graph_chain, faiss_chain, question: str, chat_history: List[Tuple[str, str]] = None):
+        """Stream both chains concurrently, printing tagged tokens as they arrive.
+
+        Total compute is unchanged, but time-to-first-token replaces
+        time-to-full-answer as the perceived latency.
+        """
+        query_input = {"question": question}
+        if chat_history:
+            query_input["chat_history"] = chat_history
+
+        # Condense once up front so the gathered chains hit the memo
+        await self._precondense(question, chat_history)
+
+        async def stream_one(tag, chain):
+            chunks = []
+            async for chunk in chain.astream(query_input):
+                chunks.append(chunk)
+                print(f"[{tag}] {chunk}", end="", flush=True)
+            print()
+            return "".join(chunks)
+
+        faiss_result, graph_result = await asyncio.gather(
+            stream_one("FAISS", faiss_chain),
+            stream_one("GRAPH", graph_chain),
+        )
+
+        # Streamed answers still feed the result cache
+        self._store_result(faiss_chain, question, chat_history, faiss_result)
+        self._store_result(graph_chain, question, chat_history, graph_result)
+
         return {
             "question": question,
             "faiss_result": faiss_result,